@@ -1,16 +1,39 @@
-from fastapi import FastAPI, HTTPException, Header
+from fastapi import FastAPI, HTTPException, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
-from web3 import Web3
+from fastapi.responses import ORJSONResponse
+from web3 import Web3, AsyncWeb3, AsyncHTTPProvider, WebSocketProvider
+from web3.exceptions import ContractLogicError, Web3RPCError
 from eth_account import Account
+from cachetools import TTLCache
+from eth_abi import encode, decode
+from aiohttp import ClientSession, TCPConnector
 import os
+import json
+import hashlib
+import asyncio
+import time
+import threading
+import heapq
 from datetime import datetime
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Ultra Backend V12 - Seed Phrase Support")
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+app = FastAPI(title="Ultra Backend V12 - Seed Phrase Support", default_response_class=ORJSONResponse)
+# Comma-separated list of allowed frontend origins. Without it every origin is allowed, and since
+# credentials are on Starlette reflects the caller's Origin, so set it in production.
+CORS_ORIGINS = [origin.strip() for origin in (os.getenv("CORS_ORIGINS") or "*").split(",") if origin.strip()]
+if "*" in CORS_ORIGINS:
+    logger.warning("⚠️ CORS_ORIGINS not set - accepting credentialed requests from any origin")
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "X-Wallet-Address"],
+    max_age=86400
+)
 
 # 🔐 ADMIN WALLET CONFIGURATION - Seed Phrase Support
 
@@ -20,6 +43,11 @@ ADMIN_SEED_PHRASE = os.getenv('ADMIN_SEED_PHRASE', "exotic estate dinosaur entry
 # Method 2: Use private key directly (fallback)
 ADMIN_PRIVATE_KEY = os.getenv('ADMIN_PRIVATE_KEY', "0xabb69dff9516c0a2c53d4fc849a3fbbac280ab7f52490fd29a168b5e3292c45f")
 
+# Opt-in: set ADMIN_PREFER_PRIVATE_KEY=1 to use ADMIN_PRIVATE_KEY even when a seed phrase is set,
+# skipping the BIP39/BIP32 derivation on every cold start
+ADMIN_PREFER_PRIVATE_KEY = os.getenv("ADMIN_PREFER_PRIVATE_KEY", "").lower() in ("1", "true", "yes")
+USE_SEED_PHRASE = bool(ADMIN_SEED_PHRASE) and not (ADMIN_PREFER_PRIVATE_KEY and ADMIN_PRIVATE_KEY)
+
 ALCHEMY_KEY = os.getenv("ALCHEMY_API_KEY", "j6uyDNnArwlEpG44o93SqZ0JixvE20Tq")
 NETWORK = os.getenv("NETWORK", "mainnet")
 
@@ -30,29 +58,153 @@ CONTRACTS = [
     {"id": 3, "name": "Tertiary", "address": "0xf97A395850304b8ec9B8f9c80A17674886612065"}
 ]
 
+# 4-byte selectors for mint(address,uint256), transfer(address,uint256), symbol() and decimals():
+# calldata is encoded directly instead of going through a contract ABI on every call
+TOKEN_SELECTORS = {
+    "mint": bytes.fromhex("40c10f19"),
+    "transfer": bytes.fromhex("a9059cbb"),
+    "symbol": bytes.fromhex("95d89b41"),
+    "decimals": bytes.fromhex("313ce567")
+}
+
+def encode_token_call(method, to_address, amount):
+    return "0x" + (TOKEN_SELECTORS[method] + encode(["address", "uint256"], [to_address, amount])).hex()
+
+# Gas limits used when eth_estimateGas failed for a reason other than a revert
+DEFAULT_GAS_LIMITS = {"mint": 200000, "transfer": 100000}
+
+# /api/contracts is static: serialize its ETag once and answer repeat clients with 304
+CONTRACTS_BODY = {"contracts": CONTRACTS, "total": 3}
+CONTRACTS_ETAG = '"' + hashlib.sha256(json.dumps(CONTRACTS_BODY, sort_keys=True).encode()).hexdigest() + '"'
+
+# Ethereum Mainnet chain id never changes, so don't spend an RPC on it per transaction
+CHAIN_ID = 1
+
+# Gas price moves slowly relative to a request, reuse it for a few seconds
+GAS_PRICE_TTL = 5
+_gas_price_cache = {"value": None, "ts": 0}
+
+# Health endpoints get polled by monitors, reuse their RPC results for a few seconds
+STATUS_TTL = 3
+_status_cache = {}
+
+async def cached_status(key, fetch):
+    """Result of fetch(), reused for STATUS_TTL seconds"""
+    cached = _status_cache.get(key)
+    if cached and time.time() - cached[1] < STATUS_TTL:
+        return cached[0]
+    value = await fetch()
+    _status_cache[key] = (value, time.time())
+    return value
+
+# Receipts are checked once per new block from a newHeads subscription: tx hash -> Future
+pending_receipts = {}
+new_heads_subscribed = False
+receipt_watcher_task = None
+# A subscription that delivered no head for this long is treated as stalled (blocks come every ~12s)
+HEAD_STALL_TIMEOUT = 60
+last_head_at = 0.0
+
+# Admin nonces are handed out locally so concurrent withdrawals never reuse one
+# "free" holds reserved nonces that were never broadcast, handed out again before "next"
+nonce_state = {"next": None, "free": []}
+nonce_lock = asyncio.Lock()
+
 web3_instance = None
 admin_account = None
 admin_private_key = None
 admin_address = None
 
-def init_web3():
-    global web3_instance, admin_account, admin_private_key, admin_address
+# Shared keep-alive connection pool for both HTTP clients, created on the serving loop at startup
+http_session = None
+balance_check_task = None
+
+# Resolved at startup, keyed by CONTRACTS id (kept out of CONTRACTS so it stays JSON-serializable)
+checksum_addresses = {}
+
+# ERC-20 symbol/decimals never change for a deployed token: address (lowercase) -> (symbol, decimals)
+TOKEN_META = {}
+# Contracts with no usable decimals() (empty result or revert): address (lowercase) -> time of the answer,
+# retried after TOKEN_META_RETRY. Node and rate-limit errors are never recorded here.
+TOKEN_META_FAILED = {}
+TOKEN_META_RETRY = 300
+
+def is_revert_error(error):
+    """True if a JSON-RPC error object reports an execution revert rather than a node problem"""
+    return error.get("code") == 3 or "revert" in str(error.get("message", "")).lower()
+
+def token_meta_missing(address):
+    """True if the token's metadata is neither cached nor recently failed"""
+    key = address.lower()
+    return key not in TOKEN_META and time.time() - TOKEN_META_FAILED.get(key, 0) > TOKEN_META_RETRY
+
+async def load_token_meta(contracts):
+    """
+    Fetch symbol() and decimals() for the given contracts in one JSON-RPC batch
+    Each contract is filled in on its own: a bad symbol() falls back to "TOKEN".
+    decimals() returning nothing or reverting marks the contract as failed so it isn't
+    re-queried on every request; any other error leaves it uncached for the next request
+    """
+    calls = []
+    for contract in contracts:
+        address = checksum_addresses[contract["id"]]
+        calls.append(("eth_call", [{"to": address, "data": "0x" + TOKEN_SELECTORS["symbol"].hex()}, "latest"]))
+        calls.append(("eth_call", [{"to": address, "data": "0x" + TOKEN_SELECTORS["decimals"].hex()}, "latest"]))
+    responses = await web3_instance.provider.make_batch_request(calls)
+    if not isinstance(responses, list):
+        raise ValueError(responses.get("error"))
+    
+    for index, contract in enumerate(contracts):
+        key = contract["address"].lower()
+        symbol_result = responses[2 * index].get("result")
+        decimals_result = responses[2 * index + 1].get("result")
+        decimals_error = responses[2 * index + 1].get("error")
+        if decimals_result == "0x" or (decimals_error and is_revert_error(decimals_error)):
+            logger.warning("⚠️ %s has no decimals(), using defaults", contract["name"])
+            TOKEN_META_FAILED[key] = time.time()
+            continue
+        try:
+            token_decimals = decode(["uint8"], bytes.fromhex(decimals_result[2:]))[0]
+        except Exception:
+            logger.warning("⚠️ decimals() lookup failed for %s: %s", contract["name"], decimals_error or decimals_result)
+            continue
+        try:
+            token_symbol = decode(["string"], bytes.fromhex(symbol_result[2:]))[0]
+        except Exception:
+            token_symbol = "TOKEN"
+        TOKEN_META[key] = (token_symbol, token_decimals)
+        TOKEN_META_FAILED.pop(key, None)
+
+async def check_admin_balance():
+    """Log the admin ETH balance and warn when it's too low for gas"""
+    try:
+        balance_wei = await web3_instance.eth.get_balance(admin_address)
+        balance_eth = web3_instance.from_wei(balance_wei, 'ether')
+        logger.info("💰 Admin Balance: %.6f ETH", balance_eth)
+        
+        if balance_eth < 0.01:
+            logger.warning("⚠️ Low ETH balance for gas fees: %.6f ETH", balance_eth)
+    except Exception as e:
+        logger.error("⚠️ Could not check balance: %s", e)
+
+async def init_web3():
+    global web3_instance, http_session, admin_account, admin_private_key, admin_address, balance_check_task
     
     # 🔐 DERIVE WALLET FROM SEED PHRASE OR USE PRIVATE KEY
-    if ADMIN_SEED_PHRASE:
+    if USE_SEED_PHRASE:
         try:
             # ✅ Enable HD Wallet features for mnemonic support
             Account.enable_unaudited_hdwallet_features()
             
-            # ✅ Derive wallet from seed phrase
-            admin_account = Account.from_mnemonic(ADMIN_SEED_PHRASE)
+            # ✅ Derive wallet from seed phrase (PBKDF2, so keep it off the event loop)
+            admin_account = await asyncio.to_thread(Account.from_mnemonic, ADMIN_SEED_PHRASE)
             admin_private_key = admin_account.key.hex()
             admin_address = admin_account.address
             
             logger.info("✅ Admin wallet DERIVED from seed phrase")
-            logger.info(f"📍 Address: {admin_address}")
+            logger.info("📍 Address: %s", admin_address)
         except Exception as e:
-            logger.error(f"❌ Failed to derive from seed phrase: {e}")
+            logger.error("❌ Failed to derive from seed phrase: %s", e)
             return False
             
     elif ADMIN_PRIVATE_KEY:
@@ -64,9 +216,9 @@ def init_web3():
             admin_address = admin_account.address
             
             logger.info("✅ Admin wallet loaded from private key")
-            logger.info(f"📍 Address: {admin_address}")
+            logger.info("📍 Address: %s", admin_address)
         except Exception as e:
-            logger.error(f"❌ Failed to load private key: {e}")
+            logger.error("❌ Failed to load private key: %s", e)
             return False
     else:
         logger.warning("⚠️ No admin wallet configured - set ADMIN_SEED_PHRASE or ADMIN_PRIVATE_KEY")
@@ -78,49 +230,206 @@ def init_web3():
         return False
     
     try:
-        web3_instance = Web3(Web3.HTTPProvider(f"https://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_KEY}"))
+        rpc_url = f"https://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_KEY}"
+        # Only eth_chainId is cached: web3's validation middleware asks for it on every eth_call.
+        # No validation threshold, so caching never issues its own eth_chainId lookups.
+        provider_kwargs = {
+            "cache_allowed_requests": True,
+            "cacheable_requests": {"eth_chainId"},
+            "request_cache_validation_threshold": None
+        }
+        web3_instance = AsyncWeb3(AsyncHTTPProvider(rpc_url, **provider_kwargs))
+        
+        # web3's default session closes the connection after every request; reuse warm connections instead
+        http_session = ClientSession(connector=TCPConnector(limit=100, keepalive_timeout=60, ttl_dns_cache=300))
+        await web3_instance.provider.cache_async_session(http_session)
         
-        if not web3_instance.is_connected():
+        if not await web3_instance.is_connected():
             logger.error("❌ Failed to connect to Ethereum")
             return False
             
         logger.info("✅ Connected to Ethereum Mainnet")
         
         for contract in CONTRACTS:
-            logger.info(f"📋 {contract['name']}: {contract['address']}")
+            logger.info("📋 %s: %s", contract['name'], contract['address'])
+            checksum_addresses[contract["id"]] = Web3.to_checksum_address(contract["address"])
         
-        # Check admin wallet balance
+        # Token metadata is immutable, fetch it once for all contracts
         try:
-            balance_wei = web3_instance.eth.get_balance(admin_address)
-            balance_eth = web3_instance.from_wei(balance_wei, 'ether')
-            logger.info(f"💰 Admin Balance: {balance_eth:.6f} ETH")
-            
-            if balance_eth < 0.01:
-                logger.warning(f"⚠️ Low ETH balance for gas fees: {balance_eth:.6f} ETH")
+            await load_token_meta(CONTRACTS)
+            logger.info("🪙 Token metadata cached for %d contracts", len(TOKEN_META))
         except Exception as e:
-            logger.error(f"⚠️ Could not check balance: {e}")
+            logger.warning("⚠️ Could not load token metadata: %s", e)
+        
+        # Check admin wallet balance in the background so startup doesn't wait on it
+        balance_check_task = asyncio.create_task(check_admin_balance())
         
         return True
         
     except Exception as error:
-        logger.error(f"❌ Web3 init error: {error}")
+        logger.error("❌ Web3 init error: %s", error)
         return False
 
-web3_ready = init_web3()
+web3_ready = False
 
-TOKEN_ABI = [
-    {"inputs": [{"type": "address"}, {"type": "uint256"}], "name": "mint", "type": "function"},
-    {"inputs": [{"type": "address"}, {"type": "uint256"}], "name": "transfer", "type": "function"},
-    {"inputs": [], "name": "decimals", "outputs": [{"type": "uint8"}], "type": "function"},
-    {"inputs": [], "name": "symbol", "outputs": [{"type": "string"}], "type": "function"}
-]
+async def get_gas_price():
+    """Current gas price, cached for GAS_PRICE_TTL seconds"""
+    if _gas_price_cache["value"] is not None and time.time() - _gas_price_cache["ts"] < GAS_PRICE_TTL:
+        return _gas_price_cache["value"]
+    value = await web3_instance.eth.gas_price
+    _gas_price_cache.update(value=value, ts=time.time())
+    return value
+
+async def reserve_nonce():
+    """Next admin nonce, seeded from the node's pending count on first use"""
+    async with nonce_lock:
+        if nonce_state["free"]:
+            return heapq.heappop(nonce_state["free"])
+        if nonce_state["next"] is None:
+            nonce_state["next"] = await web3_instance.eth.get_transaction_count(admin_address, 'pending')
+        nonce = nonce_state["next"]
+        nonce_state["next"] += 1
+        return nonce
+
+async def release_nonce(nonce):
+    """
+    Give back a reserved nonce that was never broadcast
+    Rolls "next" back only if nothing was reserved after it, otherwise keeps the gap
+    for re-use: later nonces may be in flight for other withdrawals
+    """
+    async with nonce_lock:
+        if nonce_state["next"] == nonce + 1:
+            nonce_state["next"] = nonce
+            # Free nonces directly below are now the top as well
+            while nonce_state["free"] and nonce_state["next"] - 1 in nonce_state["free"]:
+                nonce_state["free"].remove(nonce_state["next"] - 1)
+                nonce_state["next"] -= 1
+            heapq.heapify(nonce_state["free"])
+        else:
+            heapq.heappush(nonce_state["free"], nonce)
+
+async def resync_nonce():
+    """Catch up with the node after "nonce too low" (the wallet was used elsewhere); never moves back"""
+    async with nonce_lock:
+        pending = await web3_instance.eth.get_transaction_count(admin_address, 'pending')
+        nonce_state["next"] = max(nonce_state["next"] or 0, pending)
+        nonce_state["free"] = [nonce for nonce in nonce_state["free"] if nonce >= pending]
+        heapq.heapify(nonce_state["free"])
+
+async def estimate_gas_batch(txs):
+    """
+    eth_estimateGas for several transactions in one JSON-RPC batch
+    Returns the estimate for each transaction, ContractLogicError if it would revert,
+    or ValueError if the node couldn't estimate it
+    """
+    responses = await web3_instance.provider.make_batch_request(
+        [("eth_estimateGas", [tx]) for tx in txs]
+    )
+    if not isinstance(responses, list):
+        return [ValueError(responses.get("error"))] * len(txs)
+    
+    results = []
+    for response in responses:
+        error = response.get("error")
+        if error is None and response.get("result") is not None:
+            results.append(int(response["result"], 16))
+        elif error and is_revert_error(error):
+            results.append(ContractLogicError(error.get("message"), data=error.get("data")))
+        else:
+            results.append(ValueError(error))
+    return results
+
+async def resolve_pending_receipts():
+    """
+    Check all pending transactions in one batch and resolve the mined ones
+    Mined receipts are fetched once more through web3 so they come back formatted
+    """
+    tx_hashes = [tx_hash for tx_hash, future in pending_receipts.items() if not future.done()]
+    if not tx_hashes:
+        return
+    
+    responses = await web3_instance.provider.make_batch_request(
+        [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in tx_hashes]
+    )
+    if not isinstance(responses, list):
+        logger.warning("⚠️ Receipt batch failed: %s", responses.get('error'))
+        return
+    
+    for tx_hash, response in zip(tx_hashes, responses):
+        if response.get("result") is None:
+            continue
+        future = pending_receipts.get(tx_hash)
+        if future is None or future.done():
+            continue
+        try:
+            receipt = await web3_instance.eth.get_transaction_receipt(tx_hash)
+        except Exception as e:
+            # Retried on the next block
+            logger.warning("⚠️ Could not fetch receipt %s: %s", tx_hash, e)
+            continue
+        if not future.done():
+            future.set_result(receipt)
+
+async def watch_new_heads():
+    """Background task: keep a newHeads subscription open and check receipts on every block"""
+    global new_heads_subscribed, last_head_at
+    wss_url = f"wss://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_KEY}"
+    
+    while True:
+        try:
+            async with AsyncWeb3(WebSocketProvider(wss_url)) as w3_ws:
+                await w3_ws.eth.subscribe("newHeads")
+                new_heads_subscribed = True
+                last_head_at = time.time()
+                logger.info("✅ Subscribed to newHeads")
+                
+                heads = w3_ws.socket.process_subscriptions()
+                while True:
+                    # Heartbeat: a silent socket raises TimeoutError here and gets reconnected
+                    await asyncio.wait_for(heads.__anext__(), HEAD_STALL_TIMEOUT)
+                    last_head_at = time.time()
+                    try:
+                        await resolve_pending_receipts()
+                    except Exception as e:
+                        logger.warning("⚠️ Receipt check failed: %s", e)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("⚠️ newHeads subscription lost: %s", e)
+        finally:
+            new_heads_subscribed = False
+        
+        await asyncio.sleep(5)
+
+def new_heads_live():
+    """True while the newHeads subscription is up and still delivering blocks"""
+    return new_heads_subscribed and time.time() - last_head_at < HEAD_STALL_TIMEOUT
 
-sessions = {}
+async def wait_for_receipt(tx_hash, timeout=120):
+    """Wait for a transaction receipt, falling back to polling if the subscription is down"""
+    if not new_heads_live():
+        return await web3_instance.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
+    
+    tx_hash_hex = tx_hash.to_0x_hex()
+    future = pending_receipts.setdefault(tx_hash_hex, asyncio.get_running_loop().create_future())
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        # The subscription may have gone quiet: ask the node once before giving up
+        return await web3_instance.eth.get_transaction_receipt(tx_hash)
+    finally:
+        pending_receipts.pop(tx_hash_hex, None)
 
-def process_withdrawal(user_wallet, amount_requested, preferred_contract):
+# Engine sessions expire after a day and are capped so the dict can't grow without bound.
+# start/stop run in FastAPI's threadpool and TTLCache isn't thread-safe, hence the lock.
+sessions = TTLCache(maxsize=100_000, ttl=86400)
+sessions_lock = threading.Lock()
+
+async def process_withdrawal(user_wallet, amount_requested, preferred_contract):
     """
     Process withdrawal with automatic fallback across 3 contracts
-    Tries mint() and transfer() on each contract
+    Estimates gas for mint() on all contracts in one batch, then transfer(),
+    and only sends a real transaction where the estimate did not revert
     """
     if not web3_instance or not admin_account:
         raise HTTPException(503, "Web3 not connected")
@@ -129,127 +438,189 @@ def process_withdrawal(user_wallet, amount_requested, preferred_contract):
     if amount_requested <= 0:
         raise ValueError("Invalid amount")
     
+    user_checksum = Web3.to_checksum_address(user_wallet)
+    
     # Build contract list with preferred contract first
     contract_list = []
+    seen_ids = set()
     if preferred_contract:
+        preferred_lower = preferred_contract.lower()
         for contract in CONTRACTS:
-            if contract["address"].lower() == preferred_contract.lower():
+            if contract["address"].lower() == preferred_lower:
                 contract_list.append(contract)
+                seen_ids.add(contract["id"])
                 break
     for contract in CONTRACTS:
-        if contract not in contract_list:
+        if contract["id"] not in seen_ids:
             contract_list.append(contract)
+            seen_ids.add(contract["id"])
+    
+    logger.info("💰 Processing withdrawal: %s to %s", amount_requested, user_wallet)
     
-    logger.info(f"💰 Processing withdrawal: {amount_requested} to {user_wallet}")
+    # Token info (cached) and amount in each token's base units
+    amounts_in_wei = {}
+    missing_meta = [c for c in contract_list if token_meta_missing(c["address"])]
+    if missing_meta:
+        try:
+            await load_token_meta(missing_meta)
+        except:
+            pass
+    for contract_data in contract_list:
+        token_symbol, token_decimals = TOKEN_META.get(contract_data["address"].lower(), ("TOKEN", 18))
+        amounts_in_wei[contract_data["id"]] = int(amount_requested * (10 ** token_decimals))
     
-    for index, contract_data in enumerate(contract_list):
-        logger.info(f"🎯 Attempt {index+1}/3: {contract_data['name']} ({contract_data['address'][:10]}...)")
+    # 🎯 Try mint() first, then transfer(): estimate gas for the method on all contracts in one
+    # batch and only sign and send a real transaction to the contracts where it did not revert
+    for method in ("mint", "transfer"):
+        calldata = {
+            contract_data["id"]: encode_token_call(method, user_checksum, amounts_in_wei[contract_data["id"]])
+            for contract_data in contract_list
+        }
         
         try:
-            token_contract = web3_instance.eth.contract(
-                address=Web3.to_checksum_address(contract_data["address"]), 
-                abi=TOKEN_ABI
-            )
+            gas_estimates = await estimate_gas_batch([
+                {'from': admin_address, 'to': checksum_addresses[contract_data["id"]], 'data': calldata[contract_data["id"]]}
+                for contract_data in contract_list
+            ])
+        except Exception as estimate_error:
+            gas_estimates = [estimate_error] * len(contract_list)
+        
+        for index, (contract_data, gas_estimate) in enumerate(zip(contract_list, gas_estimates)):
+            if isinstance(gas_estimate, ContractLogicError):
+                logger.warning("   ⚠️ %s() would revert on %s: %.100s", method, contract_data['name'], gas_estimate)
+                continue
             
-            # Get token info
-            try:
-                token_symbol = token_contract.functions.symbol().call()
-                token_decimals = token_contract.functions.decimals().call()
-            except:
-                token_symbol = "TOKEN"
-                token_decimals = 18
+            if isinstance(gas_estimate, Exception):
+                # The estimate failed without a revert (rate limit, node error): confirm with a
+                # plain eth_call before spending gas, and fall back to the fixed gas limit
+                try:
+                    await web3_instance.eth.call({
+                        'from': admin_address,
+                        'to': checksum_addresses[contract_data["id"]],
+                        'data': calldata[contract_data["id"]]
+                    })
+                except Exception as call_error:
+                    logger.warning("   ⚠️ %s() dry-run failed on %s: %.100s", method, contract_data['name'], call_error)
+                    continue
+                gas_limit = DEFAULT_GAS_LIMITS[method]
+            else:
+                gas_limit = int(gas_estimate * 1.2)
             
-            amount_in_wei = int(amount_requested * (10 ** token_decimals))
-            current_gas_price = web3_instance.eth.gas_price
-            current_nonce = web3_instance.eth.get_transaction_count(admin_address)
+            logger.info("🎯 Attempt %d/3: %s (%.10s...)", index + 1, contract_data['name'], contract_data['address'])
             
-            # 🎯 METHOD 1: Try mint()
             try:
-                logger.info(f"   📞 Trying mint({amount_requested} {token_symbol})...")
+                token_symbol, _ = TOKEN_META.get(contract_data["address"].lower(), ("TOKEN", 18))
                 
-                mint_tx = token_contract.functions.mint(
-                    Web3.to_checksum_address(user_wallet), 
-                    amount_in_wei
-                ).build_transaction({
-                    'from': admin_address, 
-                    'nonce': current_nonce, 
-                    'gas': 200000, 
-                    'gasPrice': int(current_gas_price * 1.2), 
-                    'chainId': web3_instance.eth.chain_id
-                })
+                current_gas_price = await get_gas_price()
                 
-                # 🔐 Sign with admin private key (from seed phrase or direct)
-                signed_tx = web3_instance.eth.account.sign_transaction(mint_tx, admin_private_key)
-                tx_hash = web3_instance.eth.send_raw_transaction(signed_tx.rawTransaction)
-                receipt = web3_instance.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+                logger.info("   📞 Trying %s(%s %s)...", method, amount_requested, token_symbol)
                 
-                if receipt['status'] == 1:
-                    logger.info(f"   ✅ MINT SUCCESS! TX: {tx_hash.hex()}")
-                    return {
-                        "success": True,
-                        "method": "mint",
-                        "contract": contract_data['name'],
-                        "contractAddress": contract_data["address"],
-                        "txHash": tx_hash.hex(),
-                        "blockNumber": receipt['blockNumber'],
-                        "symbol": token_symbol,
-                        "gasUsed": receipt['gasUsed']
+                current_nonce = await reserve_nonce()
+                signed_tx = None
+                try:
+                    tx = {
+                        'to': checksum_addresses[contract_data["id"]],
+                        'from': admin_address, 
+                        'data': calldata[contract_data["id"]],
+                        'value': 0,
+                        'nonce': current_nonce, 
+                        'gas': gas_limit, 
+                        'gasPrice': int(current_gas_price * 1.2), 
+                        'chainId': CHAIN_ID
                     }
-            except Exception as mint_error:
-                logger.warning(f"   ⚠️ mint() failed: {str(mint_error)[:100]}")
+                    
+                    # 🔐 Sign with admin private key (from seed phrase or direct), off the event loop
+                    signed_tx = await asyncio.to_thread(web3_instance.eth.account.sign_transaction, tx, admin_private_key)
+                    tx_hash = await web3_instance.eth.send_raw_transaction(signed_tx.raw_transaction)
+                except (Web3RPCError, ContractLogicError) as send_error:
+                    # The node answered with a JSON-RPC error, so it decided on this transaction
+                    error_text = str(send_error).lower()
+                    # "already known" means the node has this exact transaction
+                    if "already known" in error_text:
+                        tx_hash = signed_tx.hash
+                    else:
+                        if "nonce too low" in error_text or "replacement transaction underpriced" in error_text:
+                            # The nonce is taken by another transaction: never hand it out again
+                            await resync_nonce()
+                        else:
+                            await release_nonce(current_nonce)
+                        raise
+                except Exception as send_error:
+                    if signed_tx is None:
+                        # Failed before anything was sent
+                        await release_nonce(current_nonce)
+                        raise
+                    # Timeout or dropped connection: the node may already have accepted it.
+                    # Rebroadcasting the same signed bytes can't pay twice and closes the nonce
+                    # gap if the first send never arrived; either way it's tracked as sent.
+                    logger.warning("   ⚠️ %s() send outcome unknown, tracking it as sent: %.100r", method, send_error)
+                    try:
+                        await web3_instance.eth.send_raw_transaction(signed_tx.raw_transaction)
+                    except Exception:
+                        pass
+                    tx_hash = signed_tx.hash
+            except Exception as send_error:
+                logger.warning("   ⚠️ %s() failed: %.100s", method, send_error)
+                continue
             
-            # 🎯 METHOD 2: Try transfer()
+            # The transaction is out: from here on never fall through to another contract or
+            # method, a second send would use a fresh nonce and pay the user twice
+            tx_hash_hex = tx_hash.to_0x_hex()
             try:
-                logger.info(f"   📞 Trying transfer({amount_requested} {token_symbol})...")
-                
-                new_nonce = web3_instance.eth.get_transaction_count(admin_address)
-                
-                transfer_tx = token_contract.functions.transfer(
-                    Web3.to_checksum_address(user_wallet), 
-                    amount_in_wei
-                ).build_transaction({
-                    'from': admin_address, 
-                    'nonce': new_nonce, 
-                    'gas': 100000, 
-                    'gasPrice': int(current_gas_price * 1.2), 
-                    'chainId': web3_instance.eth.chain_id
-                })
-                
-                # 🔐 Sign with admin private key
-                signed_tx = web3_instance.eth.account.sign_transaction(transfer_tx, admin_private_key)
-                tx_hash = web3_instance.eth.send_raw_transaction(signed_tx.rawTransaction)
-                receipt = web3_instance.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
-                
-                if receipt['status'] == 1:
-                    logger.info(f"   ✅ TRANSFER SUCCESS! TX: {tx_hash.hex()}")
-                    return {
-                        "success": True,
-                        "method": "transfer",
-                        "contract": contract_data['name'],
-                        "contractAddress": contract_data["address"],
-                        "txHash": tx_hash.hex(),
-                        "blockNumber": receipt['blockNumber'],
-                        "symbol": token_symbol,
-                        "gasUsed": receipt['gasUsed']
-                    }
-            except Exception as transfer_error:
-                logger.warning(f"   ⚠️ transfer() failed: {str(transfer_error)[:100]}")
-                
-        except Exception as contract_error:
-            logger.error(f"   ❌ Contract {index+1} error: {str(contract_error)[:100]}")
-            continue
+                receipt = await wait_for_receipt(tx_hash, timeout=120)
+            except Exception as receipt_error:
+                logger.warning("   ⏳ %s() TX %s not confirmed yet: %.100s", method, tx_hash_hex, receipt_error)
+                return {
+                    "success": False,
+                    "pending": True,
+                    "method": method,
+                    "contract": contract_data['name'],
+                    "contractAddress": contract_data["address"],
+                    "txHash": tx_hash_hex,
+                    "symbol": token_symbol
+                }
+            
+            if receipt['status'] == 1:
+                logger.info("   ✅ %s SUCCESS! TX: %s", method.upper(), tx_hash_hex)
+                return {
+                    "success": True,
+                    "method": method,
+                    "contract": contract_data['name'],
+                    "contractAddress": contract_data["address"],
+                    "txHash": tx_hash_hex,
+                    "blockNumber": receipt['blockNumber'],
+                    "symbol": token_symbol,
+                    "gasUsed": receipt['gasUsed']
+                }
+            
+            # Reverted on-chain: nothing was paid out, so the next contract/method may be tried
+            logger.warning("   ⚠️ %s() reverted on-chain: %s", method, tx_hash_hex)
     
     # All methods failed
     logger.error("❌ ALL CONTRACTS AND METHODS FAILED")
     raise HTTPException(500, "All withdrawal methods exhausted")
 
+@app.on_event("startup")
+async def _startup():
+    global web3_ready, receipt_watcher_task
+    web3_ready = await init_web3()
+    if web3_ready:
+        receipt_watcher_task = asyncio.create_task(watch_new_heads())
+
+@app.on_event("shutdown")
+async def _shutdown():
+    if receipt_watcher_task:
+        receipt_watcher_task.cancel()
+    if http_session:
+        await http_session.close()
+
 @app.get("/")
-def root():
+async def root():
     """Health check endpoint"""
     admin_bal = None
     if admin_address and web3_instance:
         try:
-            bal = web3_instance.eth.get_balance(admin_address)
+            bal = await cached_status(("balance", admin_address), lambda: web3_instance.eth.get_balance(admin_address))
             admin_bal = float(web3_instance.from_wei(bal, 'ether'))
         except:
             pass
@@ -261,19 +632,20 @@ def root():
         "web3_ready": web3_ready,
         "admin_wallet": admin_address,
         "admin_eth_balance": admin_bal,
-        "wallet_source": "seed_phrase" if ADMIN_SEED_PHRASE else "private_key" if ADMIN_PRIVATE_KEY else "none",
+        "wallet_source": "seed_phrase" if USE_SEED_PHRASE else "private_key" if ADMIN_PRIVATE_KEY else "none",
         "contracts": CONTRACTS,
         "total": len(CONTRACTS),
         "network": "Ethereum Mainnet",
-        "chain_id": 1
+        "chain_id": CHAIN_ID
     }
 
 @app.post("/api/engine/start")
 def start(data: dict):
     """Start earning engine session"""
     user_wallet = data.get("walletAddress", "").lower()
-    sessions[user_wallet] = {"start": datetime.now().timestamp(), "active": True}
-    logger.info(f"✅ Session started for {user_wallet}")
+    with sessions_lock:
+        sessions[user_wallet] = {"start": datetime.now().timestamp(), "active": True}
+    logger.info("✅ Session started for %s", user_wallet)
     return {"success": True, "session_id": user_wallet}
 
 @app.get("/api/engine/metrics")
@@ -288,7 +660,7 @@ def metrics(x_wallet_address: str = Header(None)):
     }
 
 @app.post("/api/engine/withdraw")
-def withdraw_endpoint(data: dict):
+async def withdraw_endpoint(data: dict):
     """
     Process withdrawal request
     Supports: ETH, WETH, WBTC
@@ -304,41 +676,55 @@ def withdraw_endpoint(data: dict):
     if not user_wallet or amount_requested <= 0:
         raise HTTPException(400, "Invalid withdrawal request")
     
-    logger.info(f"💰 Withdrawal request: {amount_requested} {token_symbol} to {user_wallet}")
+    logger.info("💰 Withdrawal request: %s %s to %s", amount_requested, token_symbol, user_wallet)
     
     try:
-        result = process_withdrawal(user_wallet, amount_requested, preferred)
-        logger.info(f"✅ Withdrawal successful: {result['txHash']}")
+        result = await process_withdrawal(user_wallet, amount_requested, preferred)
+        if result.get("pending"):
+            # Sent but unconfirmed: the client must not retry, it would be paid twice
+            logger.warning("⏳ Withdrawal pending: %s", result['txHash'])
+            return ORJSONResponse(result, status_code=202)
+        logger.info("✅ Withdrawal successful: %s", result['txHash'])
         return result
     except Exception as error:
-        logger.error(f"❌ Withdrawal failed: {error}")
+        logger.error("❌ Withdrawal failed: %s", error)
         raise HTTPException(500, f"Withdrawal failed: {str(error)}")
 
 @app.post("/api/engine/stop")
 def stop(data: dict):
     """Stop earning engine session"""
     user_wallet = data.get("walletAddress", "").lower()
-    if user_wallet in sessions:
-        sessions[user_wallet]["active"] = False
+    with sessions_lock:
+        session = sessions.get(user_wallet)
+        if session:
+            session["active"] = False
     return {"success": True}
 
 @app.get("/api/health")
-def health():
+async def health():
     """Detailed health check"""
     return {
-        "web3_connected": web3_instance.is_connected() if web3_instance else False,
+        "web3_connected": await cached_status("connected", web3_instance.is_connected) if web3_instance else False,
         "admin_configured": admin_account is not None,
-        "wallet_source": "seed_phrase" if ADMIN_SEED_PHRASE else "private_key" if ADMIN_PRIVATE_KEY else "none",
+        "wallet_source": "seed_phrase" if USE_SEED_PHRASE else "private_key" if ADMIN_PRIVATE_KEY else "none",
         "contracts": CONTRACTS,
         "contract_count": 3
     }
 
 @app.get("/api/contracts")
-def get_contracts():
+def get_contracts(response: Response, if_none_match: str = Header(None)):
     """Get all production contracts"""
-    return {"contracts": CONTRACTS, "total": 3}
+    if if_none_match:
+        client_etags = [etag.strip().removeprefix("W/") for etag in if_none_match.split(",")]
+        if CONTRACTS_ETAG in client_etags or "*" in client_etags:
+            return Response(status_code=304, headers={"ETag": CONTRACTS_ETAG})
+    response.headers["ETag"] = CONTRACTS_ETAG
+    return CONTRACTS_BODY
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # The nonce manager and sessions are per process: several workers would hand out
+    # the same admin nonces, so WEB_CONCURRENCY defaults to a single worker
+    workers = int(os.getenv("WEB_CONCURRENCY", 1))
+    uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers, loop="uvloop", http="httptools")